@@ -92,6 +92,7 @@ class P115StrgmSub(_PluginBase):
     _music_115_path: str = ""
     _music_local_path: str = ""
     _music_url_prefix: str = ""
+    _music_cache_ttl: int = MusicStrmHandler.DEFAULT_CACHE_TTL
     
     # [新增] 音乐处理器
     _music_handler: Optional[MusicStrmHandler] = None
@@ -195,6 +196,8 @@ class P115StrgmSub(_PluginBase):
             self._music_115_path = config.get("music_115_path", "/我的接收/Music")
             self._music_local_path = config.get("music_local_path", "/data/music_strm")
             self._music_url_prefix = config.get("music_url_prefix", "")
+            self._music_cache_ttl = int(config.get("music_cache_ttl", MusicStrmHandler.DEFAULT_CACHE_TTL)
+                                        or MusicStrmHandler.DEFAULT_CACHE_TTL)
 
             new_block_state = config.get("block_system_subscribe", False)
             old_block_state = self._block_system_subscribe
@@ -328,25 +331,29 @@ class P115StrgmSub(_PluginBase):
             save_data_func=self.save_data
         )
 
-        self._api_handler = ApiHandler(
-            pansou_client=self._pansou_client,
-            p115_manager=self._p115_manager,
-            only_115=self._only_115,
-            save_path=self._save_path,
-            get_data_func=self.get_data,
-            save_data_func=self.save_data
-        )
         # [新增] 初始化音乐处理器
         if self._music_sync_enabled and self._p115_manager:
             self._music_handler = MusicStrmHandler(
                 p115_manager=self._p115_manager,
                 p115_root_path=self._music_115_path,
                 local_save_path=self._music_local_path,
-                url_prefix=self._music_url_prefix
+                url_prefix=self._music_url_prefix,
+                cache_dir=str(self.get_data_path()),
+                cache_ttl=self._music_cache_ttl
             )
         else:
             self._music_handler = None
-            
+
+        self._api_handler = ApiHandler(
+            pansou_client=self._pansou_client,
+            p115_manager=self._p115_manager,
+            only_115=self._only_115,
+            save_path=self._save_path,
+            get_data_func=self.get_data,
+            save_data_func=self.save_data,
+            music_handler=self._music_handler
+        )
+
     def get_state(self) -> bool:
         return self._enabled
 
@@ -377,6 +384,12 @@ class P115StrgmSub(_PluginBase):
                 "endpoint": self.api_clear_history,
                 "methods": ["POST"],
                 "summary": "清空历史记录"
+            },
+            {
+                "path": "/clear_music_cache",
+                "endpoint": self.api_clear_music_cache,
+                "methods": ["POST"],
+                "summary": "清空音乐目录列表缓存"
             }
         ]
 
@@ -460,7 +473,8 @@ class P115StrgmSub(_PluginBase):
             "music_sync_enabled": self._music_sync_enabled,
             "music_115_path": self._music_115_path,
             "music_local_path": self._music_local_path,
-            "music_url_prefix": self._music_url_prefix
+            "music_url_prefix": self._music_url_prefix,
+            "music_cache_ttl": self._music_cache_ttl
         })
 
     def stop_service(self):
@@ -471,6 +485,8 @@ class P115StrgmSub(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            if self._p115_manager:
+                self._p115_manager.close()
         except Exception as e:
             logger.error(f"退出插件失败：{str(e)}")
 
@@ -596,38 +612,40 @@ class P115StrgmSub(_PluginBase):
         if exclude_ids:
             logger.info(f"排除订阅ID: {exclude_ids}")
 
-        # 处理电影订阅
-        for subscribe in movie_subscribes:
-            if global_vars.is_system_stopped:
-                break
-
-            if subscribe.id in exclude_ids:
-                logger.info(f"订阅 {subscribe.name} (ID:{subscribe.id}) 在排除列表中，跳过处理")
-                continue
-
-            transferred_count = self._sync_handler.process_movie_subscribe(
-                subscribe=subscribe,
-                history=history,
-                transfer_details=transfer_details,
-                transferred_count=transferred_count
-            )
+        # 整个同步过程共用一个分享目录列表会话，多个订阅命中同一分享时不重复遍历
+        with self._p115_manager.listing_session():
+            # 处理电影订阅
+            for subscribe in movie_subscribes:
+                if global_vars.is_system_stopped:
+                    break
+
+                if subscribe.id in exclude_ids:
+                    logger.info(f"订阅 {subscribe.name} (ID:{subscribe.id}) 在排除列表中，跳过处理")
+                    continue
+
+                transferred_count = self._sync_handler.process_movie_subscribe(
+                    subscribe=subscribe,
+                    history=history,
+                    transfer_details=transfer_details,
+                    transferred_count=transferred_count
+                )
 
-        # 处理电视剧订阅
-        for subscribe in tv_subscribes:
-            if global_vars.is_system_stopped:
-                break
-
-            if subscribe.id in exclude_ids:
-                logger.info(f"订阅 {subscribe.name} (ID:{subscribe.id}) 在排除列表中，跳过处理")
-                continue
-
-            transferred_count = self._sync_handler.process_tv_subscribe(
-                subscribe=subscribe,
-                history=history,
-                transfer_details=transfer_details,
-                transferred_count=transferred_count,
-                exclude_ids=exclude_ids
-            )
+            # 处理电视剧订阅
+            for subscribe in tv_subscribes:
+                if global_vars.is_system_stopped:
+                    break
+
+                if subscribe.id in exclude_ids:
+                    logger.info(f"订阅 {subscribe.name} (ID:{subscribe.id}) 在排除列表中，跳过处理")
+                    continue
+
+                transferred_count = self._sync_handler.process_tv_subscribe(
+                    subscribe=subscribe,
+                    history=history,
+                    transfer_details=transfer_details,
+                    transferred_count=transferred_count,
+                    exclude_ids=exclude_ids
+                )
 
         # 保存历史记录
         self.save_data('history', history[-500:])
@@ -668,6 +686,10 @@ class P115StrgmSub(_PluginBase):
         """API: 清空历史记录"""
         return self._api_handler.clear_history(apikey)
 
+    def api_clear_music_cache(self, apikey: str) -> dict:
+        """API: 清空音乐目录列表缓存"""
+        return self._api_handler.clear_music_cache(apikey)
+
     def api_list_directories(self, path: str = "/", apikey: str = "") -> dict:
         """API: 列出115网盘指定路径下的目录"""
         return self._api_handler.list_directories(path, apikey)
@@ -1,11 +1,18 @@
 """
 115网盘客户端封装
 """
+import os
+import random
+import re
 import time
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from functools import wraps
-from dataclasses import dataclass, field
+from functools import lru_cache, wraps
+from itertools import islice
+from dataclasses import dataclass, field, replace
 from typing import Optional, List, Dict, Any, Tuple, Callable
 
 from app.log import logger
@@ -18,6 +25,60 @@ except ImportError:
     P115_AVAILABLE = False
     logger.warning("p115client 未安装，115网盘功能不可用，请安装: pip install p115client")
 
+# 热点路径中使用的随机抖动函数
+_uniform = random.uniform
+
+# 中文数字 -> 阿拉伯数字（"十" 需单独处理）
+_CN_DIGITS = str.maketrans("一二三四五六七八九", "123456789")
+
+
+def _cn_to_int(cn: str) -> int:
+    """将 "一" ~ "九十九" 的中文数字转换为整数"""
+    tens, sep, ones = cn.partition("十")
+    if not sep:
+        return int(cn.translate(_CN_DIGITS))
+    return int((tens or "一").translate(_CN_DIGITS)) * 10 + int((ones or "0").translate(_CN_DIGITS))
+
+
+# 季数目录命名模式及对应的解析函数，按优先级排列：Season 1 / S01 / 第1季 / 第一季
+# 需逐个尝试而不能合并为一个分支表达式，否则 "Friends.DTS5.1.Season 2" 会先命中靠左的 "S5"
+_SEASON_PATTERNS = (
+    (re.compile(r'[Ss]eason\s*(\d+)'), int),
+    (re.compile(r'[Ss](\d+)'), int),
+    (re.compile(r'第(\d+)季'), int),
+    (re.compile(r'第([一二三四五六七八九十]+)季'), _cn_to_int),
+)
+
+
+@lru_cache(maxsize=2048)
+def _parse_dir_season(dir_name: str) -> Optional[int]:
+    """
+    从目录名中解析季数
+
+    :param dir_name: 目录名
+    :return: 季数，目录名没有明显的季数标识时返回 None
+    """
+    for pattern, parse in _SEASON_PATTERNS:
+        match = pattern.search(dir_name)
+        if match:
+            try:
+                return parse(match.group(1))
+            except ValueError:
+                continue
+    return None
+
+
+@lru_cache(maxsize=512)
+def _extract_share_info_cached(url: str) -> Tuple[str, str]:
+    """
+    解析分享链接（带 LRU 缓存，解析失败时抛出异常且不缓存）
+
+    :param url: 115 分享链接
+    :return: (share_code, receive_code)
+    """
+    payload = share_extract_payload(url)
+    return payload.get("share_code", ""), payload.get("receive_code", "")
+
 
 @dataclass
 class ShareLinkStatus:
@@ -55,6 +116,9 @@ class RateLimiter:
     """
     API 请求速率限制器
     确保请求之间有最小间隔，并添加随机抖动避免触发风控
+
+    采用时间槽调度：在锁内为每个请求预约下一个可用时间槽，锁外再休眠，
+    多线程并发调用时各自等待自己的时间槽，不会在锁内串行休眠
     """
 
     def __init__(self, min_interval: float = 1.5, jitter_ratio: float = 0.3):
@@ -64,31 +128,43 @@ class RateLimiter:
         """
         self.min_interval = min_interval
         self.jitter_ratio = jitter_ratio
-        self.last_request_time = 0.0
+        self._next_slot = 0.0  # 下一个可用请求时间点（time.monotonic）
         self._lock = threading.Lock()
 
     def _get_jittered_interval(self) -> float:
         """获取带随机抖动的间隔时间"""
-        import random
         jitter = self.min_interval * self.jitter_ratio
-        return self.min_interval + random.uniform(-jitter, jitter)
+        return self.min_interval + _uniform(-jitter, jitter)
 
     def wait(self):
         """等待直到可以发起下一次请求（带随机抖动）"""
         with self._lock:
-            now = time.time()
-            elapsed = now - self.last_request_time
-            target_interval = self._get_jittered_interval()
-            if elapsed < target_interval:
-                sleep_time = target_interval - elapsed
-                time.sleep(sleep_time)
-            self.last_request_time = time.time()
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + self._get_jittered_interval()
+
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
 
     def acquire(self):
         """获取请求许可（wait 的别名）"""
         self.wait()
 
 
+def backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    计算带完全随机抖动的指数退避等待时间（full jitter）
+
+    在 [0, min(cap, base * 2^attempt)] 区间内随机取值，避免多个失败请求同时重试
+
+    :param attempt: 当前重试次数（从 0 开始）
+    :param base: 基础等待时间（秒）
+    :param cap: 等待时间上限（秒）
+    :return: 等待时间（秒）
+    """
+    return _uniform(0, min(cap, base * (2 ** attempt)))
+
+
 def retry_on_failure(
     max_retries: int = 3,
     initial_delay: float = 1.0,
@@ -106,7 +182,7 @@ def retry_on_failure(
     def decorator(func: Callable):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            delay = initial_delay
+            max_delay = initial_delay * backoff_factor ** max_retries
             last_exception = None
 
             for attempt in range(max_retries + 1):
@@ -115,9 +191,9 @@ def retry_on_failure(
                 except retryable_exceptions as e:
                     last_exception = e
                     if attempt < max_retries:
+                        delay = backoff(attempt, base=initial_delay, cap=max_delay)
                         logger.info(f"请求失败 (尝试 {attempt + 1}/{max_retries + 1}): {e}, {delay:.1f}秒后重试...")
                         time.sleep(delay)
-                        delay *= backoff_factor
                     else:
                         logger.warning(f"请求失败，已达最大重试次数 ({max_retries + 1}): {e}")
                         raise
@@ -130,44 +206,92 @@ def retry_on_failure(
 class PathCache:
     """
     路径缓存，带 TTL（生存时间）支持
+
+    基于 OrderedDict 按写入顺序淘汰，容量超过 max_size 时淘汰最早写入的条目，
+    并每隔 sweep_interval 次写入清理一次已过期条目，避免长时间运行时无限增长
+
+    读取不加锁（GIL 下单次 dict 读取是原子的），只有删除过期条目和写入时才加锁
     """
 
-    def __init__(self, default_ttl: int = 3600):
+    def __init__(self, default_ttl: int = 3600, max_size: int = 4096, sweep_interval: int = 256):
         """
         :param default_ttl: 默认缓存过期时间（秒）
+        :param max_size: 最大缓存条目数
+        :param sweep_interval: 每写入多少次清理一次过期条目
         """
         self.default_ttl = default_ttl
-        self._cache: Dict[str, Tuple[int, float]] = {}  # path -> (cid, timestamp)
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self._cache: OrderedDict[str, Tuple[Any, float]] = OrderedDict()  # path -> (cid, timestamp)
+        self._inserts = 0
         self._lock = threading.Lock()
 
-    def get(self, path: str) -> Optional[int]:
-        """获取缓存的 CID，如果缓存过期则返回 None"""
-        with self._lock:
-            if path not in self._cache:
-                return None
-            cid, timestamp = self._cache[path]
-            if time.time() - timestamp > self.default_ttl:
-                del self._cache[path]
-                return None
-            return cid
-
-    def set(self, path: str, cid: int):
+    def get(self, path: str) -> Optional[Any]:
+        """获取缓存的 CID（或其他缓存值），如果缓存过期则返回 None"""
+        entry = self._cache.get(path)
+        if entry is None:
+            return None
+        cid, timestamp = entry
+        if time.monotonic() - timestamp > self.default_ttl:
+            with self._lock:
+                self._cache.pop(path, None)
+            return None
+        return cid
+
+    def set(self, path: str, cid: Any):
         """设置缓存"""
         with self._lock:
-            self._cache[path] = (cid, time.time())
+            self._cache[path] = (cid, time.monotonic())
+            self._cache.move_to_end(path)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            self._inserts += 1
+            if self._inserts % self.sweep_interval == 0:
+                self._sweep_expired()
+
+    def _sweep_expired(self):
+        """清理过期条目（调用方需持有锁）"""
+        now = time.monotonic()
+        expired = [p for p, (_, ts) in self._cache.items() if now - ts > self.default_ttl]
+        for p in expired:
+            del self._cache[p]
 
     def invalidate(self, path: str):
         """使缓存失效"""
         with self._lock:
             self._cache.pop(path, None)
 
+    def invalidate_prefix(self, path: str):
+        """使指定路径及其所有子路径的缓存失效"""
+        prefix = f"{path.rstrip('/')}/"
+        with self._lock:
+            for p in [p for p in self._cache if p == path or p.startswith(prefix)]:
+                del self._cache[p]
+
     def clear(self):
         """清空缓存"""
         with self._lock:
             self._cache.clear()
 
+    def get_longest_prefix(self, prefixes: List[str]) -> Tuple[int, int, str]:
+        """
+        在一次加锁内查找已缓存的最长路径前缀
+
+        :param prefixes: 由短到长的各级路径前缀，如 ["/我的接收", "/我的接收/电影"]
+        :return: (第一个未缓存层级的索引, 最长前缀的 CID, 最长前缀路径)，没有已缓存的前缀时返回 (0, 0, "")
+        """
+        result = (0, 0, "")
+        now = time.monotonic()
+        with self._lock:
+            for i, path in enumerate(prefixes):
+                entry = self._cache.get(path)
+                if entry is not None and now - entry[1] <= self.default_ttl:
+                    result = (i + 1, entry[0], path)
+        return result
+
     def __contains__(self, path: str) -> bool:
-        return self.get(path) is not None
+        # 快速判断，不校验 TTL（可能返回已过期的条目，取值时 get() 会再次校验）
+        return path in self._cache
 
 
 class P115ClientManager:
@@ -175,17 +299,18 @@ class P115ClientManager:
 
     # 默认配置常量
     DEFAULT_MIN_INTERVAL = 1.5      # API 请求基础间隔（秒），实际会有 ±30% 随机浮动
-    DEFAULT_RECURSION_DELAY = 1.0   # 递归遍历子目录延迟（秒）
+    DEFAULT_LIST_WORKERS = min(4, os.cpu_count() or 1)  # 分享目录并发遍历线程数
     DEFAULT_PATH_CACHE_TTL = 3600   # 路径缓存过期时间（秒）
     DEFAULT_MAX_RETRIES = 3         # 最大重试次数
     DEFAULT_JITTER_RATIO = 0.3      # 请求间隔随机抖动比例（±30%）
+    DEFAULT_SHARE_STATUS_TTL = 60   # 分享状态检查结果缓存时间（秒）
+    DEFAULT_NEG_PATH_TTL = 60       # 不存在路径的缓存时间（秒）
 
     def __init__(
         self,
         cookies: str,
         user_agent: str = None,
         min_interval: float = None,
-        recursion_delay: float = None,
         path_cache_ttl: int = None
     ):
         """
@@ -194,11 +319,11 @@ class P115ClientManager:
         :param cookies: 115 Cookie
         :param user_agent: User-Agent
         :param min_interval: API 请求最小间隔（秒），默认 0.5
-        :param recursion_delay: 递归遍历子目录延迟（秒），默认 0.3
         :param path_cache_ttl: 路径缓存过期时间（秒），默认 3600
         """
         # API 调用计数器
         self._api_call_count = 0
+        self._api_call_lock = threading.Lock()
 
         self.cookies = cookies
         self.user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
@@ -208,8 +333,15 @@ class P115ClientManager:
         _min_interval = min_interval if min_interval is not None else self.DEFAULT_MIN_INTERVAL
         self.rate_limiter = RateLimiter(min_interval=_min_interval)
 
-        # 递归延迟
-        self.recursion_delay = recursion_delay if recursion_delay is not None else self.DEFAULT_RECURSION_DELAY
+        # 分享目录列表会话缓存（(share_code, cid) -> 文件列表），仅在 listing_session 内有效
+        self._dir_listing_cache: Optional[Dict[Tuple[str, int], List[dict]]] = None
+        self._listing_depth = 0
+        self._listing_lock = threading.Lock()
+
+        # 分享目录并发遍历线程池（首次使用时创建）
+        self._list_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._worker_state = threading.local()
 
         # 路径缓存（带 TTL）
         _path_cache_ttl = path_cache_ttl if path_cache_ttl is not None else self.DEFAULT_PATH_CACHE_TTL
@@ -217,8 +349,11 @@ class P115ClientManager:
         # 根目录始终缓存
         self.path_cache.set("/", 0)
 
-        # 分享信息缓存（URL -> {share_code, receive_code}）
-        self._share_info_cache: Dict[str, Dict[str, str]] = {}
+        # 近期确认不存在的路径（负缓存），避免短时间内重复探测
+        self._neg_path_cache = PathCache(default_ttl=self.DEFAULT_NEG_PATH_TTL, max_size=1024)
+
+        # 分享状态缓存（"share_code:receive_code" -> ShareLinkStatus），复用 PathCache 的 TTL + LRU 实现
+        self._share_status_cache = PathCache(default_ttl=self.DEFAULT_SHARE_STATUS_TTL, max_size=512)
 
         if P115_AVAILABLE and cookies:
             try:
@@ -226,14 +361,53 @@ class P115ClientManager:
             except Exception as e:
                 logger.error(f"初始化 P115Client 失败: {e}")
 
+    def close(self):
+        """关闭遍历线程池（HTTP 会话由 P115Client 自行管理）"""
+        with self._executor_lock:
+            if self._list_executor is not None:
+                self._list_executor.shutdown(wait=False)
+                self._list_executor = None
+
+    def _get_list_executor(self) -> ThreadPoolExecutor:
+        """获取分享目录遍历线程池（懒加载）"""
+        with self._executor_lock:
+            if self._list_executor is None:
+                self._list_executor = ThreadPoolExecutor(
+                    max_workers=self.DEFAULT_LIST_WORKERS,
+                    thread_name_prefix="p115-list"
+                )
+            return self._list_executor
+
+    @contextmanager
+    def listing_session(self):
+        """
+        分享目录列表会话
+
+        会话期间相同 (share_code, cid) 的分享目录只请求一次，适用于先列出再转存等会重复遍历同一分享的流程。
+        支持嵌套，最外层会话结束时清空缓存
+        """
+        with self._listing_lock:
+            if self._listing_depth == 0:
+                self._dir_listing_cache = {}
+            self._listing_depth += 1
+        try:
+            yield
+        finally:
+            with self._listing_lock:
+                self._listing_depth -= 1
+                if self._listing_depth == 0:
+                    self._dir_listing_cache = None
+
     def _rate_limited_call(self, func: Callable, *args, **kwargs):
         """
-        带速率限制的 API 调用封装
+        带速率限制的 API 调用封装（同时统计 API 调用次数）
 
         :param func: 要调用的函数
         :return: 函数返回值
         """
         self.rate_limiter.wait()
+        with self._api_call_lock:
+            self._api_call_count += 1
         return func(*args, **kwargs)
 
     def check_login(self) -> bool:
@@ -242,9 +416,7 @@ class P115ClientManager:
             return False
 
         try:
-            self.rate_limiter.wait()
-            self._api_call_count += 1
-            user_info = self.client.user_my_info()
+            user_info = self._rate_limited_call(self.client.user_my_info)
             if user_info.get("state"):
                 uname = user_info.get('data', {}).get('uname', '未知')
                 logger.info(f"115 登录成功: {uname}")
@@ -280,17 +452,17 @@ class P115ClientManager:
         if cached_cid is not None:
             return cached_cid
 
-        # 尝试直接通过 API 获取完整路径
-        try:
-            self.rate_limiter.wait()
-            self._api_call_count += 1
-            resp = self.client.fs_dir_getid(path)
-            if resp.get("id"):
-                cid = int(resp["id"])
-                self.path_cache.set(path, cid)
-                return cid
-        except Exception as e:
-            logger.info(f"直接获取路径 ID 失败 ({path}): {e}")
+        # 尝试直接通过 API 获取完整路径（近期确认不存在的路径跳过探测）
+        if self._neg_path_cache.get(path) is None:
+            try:
+                resp = self._rate_limited_call(self.client.fs_dir_getid, path)
+                if resp.get("id"):
+                    cid = int(resp["id"])
+                    self.path_cache.set(path, cid)
+                    return cid
+                self._neg_path_cache.set(path, -1)
+            except Exception as e:
+                logger.info(f"直接获取路径 ID 失败 ({path}): {e}")
 
         # 如果不创建，则返回失败
         if not mkdir:
@@ -298,24 +470,21 @@ class P115ClientManager:
 
         # ===== 优化：创建模式下直接逐级创建，不再每层都先尝试获取 =====
         parts = [p for p in path.split("/") if p]
-        parent_id = 0
-        current_path = ""
-        start_index = 0
+        prefixes = ["/" + "/".join(parts[:i + 1]) for i in range(len(parts))]
 
         # 找到最近的已缓存父目录
-        temp_path = ""
-        for i, part in enumerate(parts):
-            temp_path = f"{temp_path}/{part}"
-            temp_cid = self.path_cache.get(temp_path)
-            if temp_cid is not None:
-                parent_id = temp_cid
-                current_path = temp_path
-                start_index = i + 1
+        start_index, parent_id, current_path = self.path_cache.get_longest_prefix(prefixes)
+
+        # 剩余多级目录时，优先一次调用创建全部层级（fs_makedirs_app 会自动创建中间目录）
+        if len(parts) - start_index > 1:
+            cid = self._makedirs_batch(parts[start_index:], parent_id, prefixes[start_index:])
+            if cid is not None:
+                return cid
 
         # 从未缓存的部分开始处理（优化：直接创建，不再先获取）
         for i in range(start_index, len(parts)):
             part = parts[i]
-            current_path = f"{current_path}/{part}"
+            current_path = prefixes[i]
 
             # 再次检查缓存（可能在并发中被设置）
             cached = self.path_cache.get(current_path)
@@ -325,24 +494,22 @@ class P115ClientManager:
 
             # 直接创建目录（fs_makedirs_app 会自动处理已存在的情况）
             try:
-                self.rate_limiter.wait()
-                self._api_call_count += 1
-                resp = self.client.fs_makedirs_app(part, pid=parent_id)
+                resp = self._rate_limited_call(self.client.fs_makedirs_app, part, pid=parent_id)
                 check_response(resp)
                 if resp.get("state"):
                     cid = int(resp["cid"])
                     self.path_cache.set(current_path, cid)
+                    self._neg_path_cache.invalidate(current_path)
                     parent_id = cid
                     logger.info(f"创建目录成功: {current_path} -> {cid}")
                 elif resp.get("errno") == 20004 or "已存在" in resp.get("error", ""):
                     # 目录已存在，尝试获取其 ID
                     try:
-                        self.rate_limiter.wait()
-                        self._api_call_count += 1
-                        get_resp = self.client.fs_dir_getid(current_path)
+                        get_resp = self._rate_limited_call(self.client.fs_dir_getid, current_path)
                         if get_resp.get("id"):
                             cid = int(get_resp["id"])
                             self.path_cache.set(current_path, cid)
+                            self._neg_path_cache.invalidate(current_path)
                             parent_id = cid
                             continue
                     except Exception:
@@ -358,6 +525,31 @@ class P115ClientManager:
 
         return parent_id
 
+    def _makedirs_batch(self, parts: List[str], parent_id: int, prefixes: List[str]) -> Optional[int]:
+        """
+        一次调用创建多级目录
+
+        :param parts: 需要创建的各级目录名
+        :param parent_id: 起始父目录 ID
+        :param prefixes: 与 parts 对应的各级完整路径，最后一项为目标路径（用于缓存和日志）
+        :return: 目标目录 ID，失败返回 None（调用方回退到逐级创建）
+        """
+        path = prefixes[-1]
+        try:
+            resp = self._rate_limited_call(self.client.fs_makedirs_app, "/".join(parts), pid=parent_id)
+            if resp.get("state") and resp.get("cid"):
+                cid = int(resp["cid"])
+                self.path_cache.set(path, cid)
+                # 中间目录也随之创建，需一并清除其"不存在"缓存
+                for prefix in prefixes:
+                    self._neg_path_cache.invalidate(prefix)
+                logger.info(f"创建目录成功: {path} -> {cid}")
+                return cid
+            logger.debug(f"批量创建目录失败，回退到逐级创建 ({path}): {resp.get('error')}")
+        except Exception as e:
+            logger.debug(f"批量创建目录异常，回退到逐级创建 ({path}): {e}")
+        return None
+
     def extract_share_info(self, url: str) -> Dict[str, str]:
         """
         解析分享链接，获取 share_code 和 receive_code（带缓存）
@@ -368,23 +560,55 @@ class P115ClientManager:
         if not P115_AVAILABLE:
             return {}
 
-        # 检查缓存
-        if url in self._share_info_cache:
-            return self._share_info_cache[url]
-
         try:
-            payload = share_extract_payload(url)
-            result = {
-                "share_code": payload.get("share_code", ""),
-                "receive_code": payload.get("receive_code", "")
+            share_code, receive_code = _extract_share_info_cached(url)
+            return {
+                "share_code": share_code,
+                "receive_code": receive_code
             }
-            # 缓存结果
-            self._share_info_cache[url] = result
-            return result
         except Exception as e:
             logger.error(f"解析分享链接失败: {e}")
             return {}
 
+    def _resolve_share_codes(
+            self,
+            share_url: str,
+            require_receive_code: bool = True
+    ) -> Optional[Tuple[str, str]]:
+        """
+        解析分享链接并校验分享码
+
+        :param share_url: 115 分享链接
+        :param require_receive_code: 是否要求必须包含提取码
+        :return: (share_code, receive_code)，无效时返回 None
+        """
+        info = self.extract_share_info(share_url)
+        share_code = info.get("share_code")
+        receive_code = info.get("receive_code") or ""
+
+        if not share_code or (require_receive_code and not receive_code):
+            logger.error("无效的分享链接或解析失败")
+            return None
+        return share_code, receive_code
+
+    def _prepare_transfer(self, share_url: str, save_path: str) -> Optional[Tuple[str, str, int]]:
+        """
+        转存前的准备：解析分享链接并获取（或创建）目标目录
+
+        :param share_url: 115 分享链接
+        :param save_path: 保存路径
+        :return: (share_code, receive_code, parent_id)，失败返回 None
+        """
+        codes = self._resolve_share_codes(share_url)
+        if not codes:
+            return None
+
+        parent_id = self.get_pid_by_path(save_path, mkdir=True)
+        if parent_id == -1:
+            logger.error(f"无法获取或创建目标目录: {save_path}")
+            return None
+        return codes[0], codes[1], parent_id
+
     def check_share_status(self, share_url: str) -> ShareLinkStatus:
         """
         检查分享链接的状态（是否有效、过期、失效等）
@@ -400,18 +624,20 @@ class P115ClientManager:
             return status
 
         # 解析分享链接
-        info = self.extract_share_info(share_url)
-        share_code = info.get("share_code")
-        receive_code = info.get("receive_code")
-
-        if not share_code:
+        codes = self._resolve_share_codes(share_url, require_receive_code=False)
+        if not codes:
             status.error_message = "无效的分享链接格式"
             return status
+        share_code, receive_code = codes
+
+        # 同一次同步中多个订阅常命中同一分享，短时间内复用检查结果（按提取码区分，错误的提取码不影响正确的）
+        cache_key = f"{share_code}:{receive_code or ''}"
+        cached = self._share_status_cache.get(cache_key)
+        if cached is not None:
+            return replace(cached)
 
         try:
             # 使用 share_snap 接口检查分享状态
-            self.rate_limiter.wait()
-            self._api_call_count += 1
             payload = {
                 "share_code": share_code,
                 "receive_code": receive_code or "",
@@ -419,7 +645,7 @@ class P115ClientManager:
                 "limit": 1,  # 只获取1条记录，用于验证
                 "offset": 0,
             }
-            resp = self.client.share_snap(payload)
+            resp = self._rate_limited_call(self.client.share_snap, payload)
 
             # 检查响应状态
             state = resp.get("state")
@@ -467,6 +693,10 @@ class P115ClientManager:
 
                 logger.info(f"分享链接无效: {status.error_message} (errno: {status.error_code})")
 
+            # 只缓存明确的结果；限流等临时错误不缓存，下次重新检查
+            if status.is_valid or status.is_expired or status.is_cancelled or status.is_deleted:
+                self._share_status_cache.set(cache_key, replace(status))
+
         except Exception as e:
             status.error_message = f"检查分享状态异常: {str(e)}"
             logger.error(status.error_message)
@@ -480,8 +710,7 @@ class P115ClientManager:
         :param share_url: 115 分享链接
         :return: True 表示有效，False 表示无效或失效
         """
-        status = self.check_share_status(share_url)
-        return status.is_valid
+        return self.check_share_status(share_url).is_valid
 
     def list_share_files(
             self,
@@ -502,43 +731,39 @@ class P115ClientManager:
         if not self.client:
             return []
 
-        info = self.extract_share_info(share_url)
-        share_code = info.get("share_code")
-        receive_code = info.get("receive_code")
-
-        if not share_code or not receive_code:
-            logger.error("无效的分享链接或解析失败")
+        codes = self._resolve_share_codes(share_url)
+        if not codes:
             return []
+        share_code, receive_code = codes
 
-        return self._list_share_files_recursive(
-            share_code=share_code,
-            receive_code=receive_code,
-            cid=cid,
-            depth=1,
-            max_depth=max_depth,
-            target_season=target_season
-        )
+        with self.listing_session():
+            return self._list_share_files_recursive(
+                share_code=share_code,
+                receive_code=receive_code,
+                cid=cid,
+                depth=1,
+                max_depth=max_depth,
+                target_season=target_season
+            )
 
-    def _list_share_files_recursive(
-            self,
-            share_code: str,
-            receive_code: str,
-            cid: int = 0,
-            depth: int = 1,
-            max_depth: int = 3,
-            target_season: int = None
-    ) -> List[dict]:
-        """递归列出分享文件（带速率限制和季数过滤优化）"""
-        if depth > max_depth:
-            return []
+    def _fetch_share_dir(self, share_code: str, receive_code: str, cid: int) -> List[dict]:
+        """
+        获取分享中单个目录的文件列表（在 listing_session 内会复用已获取的结果）
+
+        :return: 文件信息列表，调用方需自行复制后再修改
+        """
+        cache = self._dir_listing_cache
+        key = (share_code, cid)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
 
         files = []
         try:
             # 速率限制
-            self.rate_limiter.wait()
-            self._api_call_count += 1
-
-            iterator = share_iterdir(
+            iterator = self._rate_limited_call(
+                share_iterdir,
                 self.client,
                 share_code=share_code,
                 receive_code=receive_code,
@@ -547,49 +772,110 @@ class P115ClientManager:
             )
 
             for item in iterator:
-                file_info = {
+                files.append({
                     "id": str(item.get("id", "")),
                     "name": item.get("name", ""),
                     "size": item.get("size", 0),
                     "is_dir": item.get("is_dir", False),
                     "sha1": item.get("sha1", ""),
                     "pick_code": item.get("pick_code", ""),
-                }
+                })
 
-                # 递归获取子目录内容（带随机延迟）
-                if file_info["is_dir"] and depth < max_depth:
-                    dir_name = file_info["name"]
+        except Exception as e:
+            logger.error(f"列出分享文件失败: {e}")
+            return files
 
-                    # 优化：如果指定了目标季数，跳过明显不匹配的季目录
-                    if target_season is not None:
-                        skip_dir = self._should_skip_season_dir(dir_name, target_season)
-                        if skip_dir:
-                            logger.info(f"跳过非目标季目录: {dir_name} (目标: S{target_season})")
-                            files.append(file_info)  # 仍然记录目录信息，但不递归
-                            continue
+        if cache is not None:
+            cache[key] = files
+        return files
 
-                    # 递归前增加随机延迟，避免频繁请求
-                    if self.recursion_delay > 0:
-                        import random
-                        jitter = self.recursion_delay * 0.3  # ±30% 随机浮动
-                        delay = self.recursion_delay + random.uniform(-jitter, jitter)
-                        time.sleep(delay)
+    def _list_share_dir(
+            self,
+            share_code: str,
+            receive_code: str,
+            cid: int,
+            depth: int,
+            max_depth: int,
+            target_season: int = None
+    ) -> Tuple[List[dict], List[Tuple[dict, int]]]:
+        """
+        列出分享中单个目录的内容（不递归）
 
-                    sub_cid = int(item.get("id", 0))
-                    children = self._list_share_files_recursive(
-                        share_code=share_code,
-                        receive_code=receive_code,
-                        cid=sub_cid,
-                        depth=depth + 1,
-                        max_depth=max_depth,
-                        target_season=target_season
-                    )
-                    file_info["children"] = children
+        :return: (文件列表, 需要继续递归的子目录列表 [(文件信息, 子目录 CID)])
+        """
+        files = [dict(f) for f in self._fetch_share_dir(share_code, receive_code, cid)]
+        subdirs = []
 
-                files.append(file_info)
+        for file_info in files:
+            # 收集需要递归的子目录
+            if file_info["is_dir"] and depth < max_depth:
+                dir_name = file_info["name"]
 
-        except Exception as e:
-            logger.error(f"列出分享文件失败: {e}")
+                # 优化：如果指定了目标季数，跳过明显不匹配的季目录
+                if target_season is not None:
+                    skip_dir = self._should_skip_season_dir(dir_name, target_season)
+                    if skip_dir:
+                        logger.info("跳过非目标季目录: %s (目标: S%s)", dir_name, target_season)
+                        continue  # 仍然记录目录信息，但不递归
+
+                subdirs.append((file_info, int(file_info["id"] or 0)))
+
+        return files, subdirs
+
+    def _list_share_files_recursive(
+            self,
+            share_code: str,
+            receive_code: str,
+            cid: int = 0,
+            depth: int = 1,
+            max_depth: int = 3,
+            target_season: int = None
+    ) -> List[dict]:
+        """
+        递归列出分享文件（带速率限制和季数过滤优化）
+
+        顶层调用会把各子目录的遍历提交到线程池并发执行，请求节奏仍由全局 RateLimiter 控制；
+        线程池内部的子树按顺序递归，避免工作线程相互等待导致线程池耗尽
+        """
+        if depth > max_depth:
+            return []
+
+        files, subdirs = self._list_share_dir(share_code, receive_code, cid, depth, max_depth, target_season)
+
+        if not subdirs:
+            return files
+
+        def walk(sub_cid: int) -> List[dict]:
+            return self._list_share_files_recursive(
+                share_code=share_code,
+                receive_code=receive_code,
+                cid=sub_cid,
+                depth=depth + 1,
+                max_depth=max_depth,
+                target_season=target_season
+            )
+
+        if getattr(self._worker_state, "in_worker", False) or len(subdirs) == 1:
+            for file_info, sub_cid in subdirs:
+                file_info["children"] = walk(sub_cid)
+            return files
+
+        def worker(sub_cid: int) -> List[dict]:
+            self._worker_state.in_worker = True
+            try:
+                return walk(sub_cid)
+            finally:
+                self._worker_state.in_worker = False
+
+        executor = self._get_list_executor()
+        futures = {executor.submit(worker, sub_cid): file_info for file_info, sub_cid in subdirs}
+        for future in as_completed(futures):
+            file_info = futures[future]
+            try:
+                file_info["children"] = future.result()
+            except Exception as e:
+                logger.error(f"列出分享子目录失败 {file_info['name']}: {e}")
+                file_info["children"] = []
 
         return files
 
@@ -601,42 +887,12 @@ class P115ClientManager:
         :param target_season: 目标季数
         :return: True 表示应跳过，False 表示需要递归
         """
-        import re
-
-        # 常见的季数目录命名模式
-        patterns = [
-            r'[Ss]eason\s*(\d+)',      # Season 1, season1
-            r'[Ss](\d+)',              # S1, s01
-            r'第(\d+)季',              # 第1季
-            r'第([一二三四五六七八九十]+)季',  # 第一季
-        ]
-
-        # 中文数字映射
-        cn_num_map = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5,
-                      '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
-
-        for pattern in patterns:
-            match = re.search(pattern, dir_name)
-            if match:
-                season_str = match.group(1)
-                # 转换中文数字
-                if season_str in cn_num_map:
-                    found_season = cn_num_map[season_str]
-                else:
-                    try:
-                        found_season = int(season_str)
-                    except ValueError:
-                        continue
-
-                # 如果目录明确是其他季，跳过
-                if found_season != target_season:
-                    return True
-                else:
-                    # 明确是目标季，不跳过
-                    return False
-
+        found_season = _parse_dir_season(dir_name)
         # 目录名没有明显的季数标识，不跳过（可能包含多季或其他内容）
-        return False
+        if found_season is None:
+            return False
+        # 如果目录明确是其他季，跳过
+        return found_season != target_season
 
     def transfer_share(self, share_url: str, save_path: str) -> bool:
         """
@@ -649,19 +905,10 @@ class P115ClientManager:
         if not self.client:
             return False
 
-        info = self.extract_share_info(share_url)
-        share_code = info.get("share_code")
-        receive_code = info.get("receive_code")
-
-        if not share_code or not receive_code:
-            logger.error("无效的分享链接或解析失败")
-            return False
-
-        # 获取目标目录 CID
-        parent_id = self.get_pid_by_path(save_path, mkdir=True)
-        if parent_id == -1:
-            logger.error(f"无法获取或创建目标目录: {save_path}")
+        prepared = self._prepare_transfer(share_url, save_path)
+        if not prepared:
             return False
+        share_code, receive_code, parent_id = prepared
 
         logger.info(f"转存分享到目录 ID: {parent_id} ({save_path})")
 
@@ -691,19 +938,10 @@ class P115ClientManager:
         if not self.client:
             return False
 
-        info = self.extract_share_info(share_url)
-        share_code = info.get("share_code")
-        receive_code = info.get("receive_code")
-
-        if not share_code or not receive_code:
-            logger.error("无效的分享链接或解析失败")
-            return False
-
-        # 获取目标目录 CID
-        parent_id = self.get_pid_by_path(save_path, mkdir=True)
-        if parent_id == -1:
-            logger.error(f"无法获取或创建目标目录: {save_path}")
+        prepared = self._prepare_transfer(share_url, save_path)
+        if not prepared:
             return False
+        share_code, receive_code, parent_id = prepared
 
         # 执行单文件转存
         return self._do_transfer(
@@ -742,71 +980,110 @@ class P115ClientManager:
         if not file_ids:
             return success_ids, failed_ids
 
-        info = self.extract_share_info(share_url)
-        share_code = info.get("share_code")
-        receive_code = info.get("receive_code")
-
-        if not share_code or not receive_code:
-            logger.error("无效的分享链接或解析失败")
-            return success_ids, file_ids
-
-        # 获取目标目录 CID（只需获取一次）
-        parent_id = self.get_pid_by_path(save_path, mkdir=True)
-        if parent_id == -1:
-            logger.error(f"无法获取或创建目标目录: {save_path}")
+        prepared = self._prepare_transfer(share_url, save_path)
+        if not prepared:
             return success_ids, file_ids
+        share_code, receive_code, parent_id = prepared
 
         total_batches = (len(file_ids) + batch_size - 1) // batch_size
-        logger.info(f"批量转存: 共 {len(file_ids)} 个文件，分 {total_batches} 批处理（每批 {batch_size} 个）")
+        logger.info("批量转存: 共 %d 个文件，分 %d 批处理（每批 %d 个）", len(file_ids), total_batches, batch_size)
 
         # 分批处理
-        for batch_index in range(0, len(file_ids), batch_size):
-            batch = file_ids[batch_index:batch_index + batch_size]
-            batch_num = batch_index // batch_size + 1
+        file_id_iter = iter(file_ids)
+        batch_num = 0
+        while batch := list(islice(file_id_iter, batch_size)):
+            batch_num += 1
+            logger.info("处理第 %d/%d 批，包含 %d 个文件", batch_num, total_batches, len(batch))
 
             # 使用逗号分隔多个文件 ID
-            file_id_str = ",".join(batch)
-
-            logger.info(f"处理第 {batch_num}/{total_batches} 批，包含 {len(batch)} 个文件")
-
             success = self._do_transfer(
                 share_code=share_code,
                 receive_code=receive_code,
-                file_id=file_id_str,
+                file_id=",".join(batch),
                 parent_id=parent_id,
                 save_path=save_path
             )
 
             if success:
                 success_ids.extend(batch)
-                logger.info(f"第 {batch_num} 批转存成功")
+                logger.info("第 %d 批转存成功", batch_num)
+            elif len(batch) > 1:
+                # 批量失败时，二分拆分重试以定位失败的文件
+                logger.warning("第 %d 批批量转存失败，拆分后重试...", batch_num)
+                self._transfer_bisect(
+                    share_code, receive_code, batch, parent_id, save_path, success_ids, failed_ids
+                )
             else:
-                # 批量失败时，尝试逐个转存以确定哪些失败
-                logger.warning(f"第 {batch_num} 批批量转存失败，尝试逐个转存...")
-                for fid in batch:
-                    single_success = self._do_transfer(
-                        share_code=share_code,
-                        receive_code=receive_code,
-                        file_id=fid,
-                        parent_id=parent_id,
-                        save_path=save_path
-                    )
-                    if single_success:
-                        success_ids.append(fid)
-                    else:
-                        failed_ids.append(fid)
+                failed_ids.extend(batch)
 
             # 批次之间添加间隔，避免触发风控
-            if batch_index + batch_size < len(file_ids):
-                import random
+            if batch_num < total_batches:
                 jitter = batch_interval * 0.3
-                actual_interval = batch_interval + random.uniform(-jitter, jitter)
-                logger.info(f"批次间隔 {actual_interval:.1f} 秒")
+                actual_interval = batch_interval + _uniform(-jitter, jitter)
+                logger.info("批次间隔 %.1f 秒", actual_interval)
                 time.sleep(actual_interval)
 
-        logger.info(f"批量转存完成: 成功 {len(success_ids)} 个，失败 {len(failed_ids)} 个")
+        logger.info("批量转存完成: 成功 %d 个，失败 %d 个", len(success_ids), len(failed_ids))
         return success_ids, failed_ids
 
+    def _transfer_bisect(
+            self,
+            share_code: str,
+            receive_code: str,
+            file_ids: List[str],
+            parent_id: int,
+            save_path: str,
+            success_ids: List[str],
+            failed_ids: List[str]
+    ):
+        """
+        将转存失败的批次二分拆分后重试，定位其中真正失败的文件
+
+        批次中只有个别文件失败时，只需 O(log N) 次请求即可定位，而不是逐个重试 N 次；
+        若拆分后两半都失败，多半是分享失效、空间不足或风控等与文件无关的原因，
+        此时不再继续拆分，直接将整批记为失败（下次运行会重试），避免请求数膨胀到 2N-2
+
+        :param file_ids: 转存失败的文件 ID 列表
+        :param success_ids: 成功的文件 ID 会追加到此列表
+        :param failed_ids: 失败的文件 ID 会追加到此列表
+        """
+        if len(file_ids) <= 4:
+            # 批次很小时二分并不比逐个重试省请求，直接逐个转存
+            for fid in file_ids:
+                if self._do_transfer(
+                    share_code=share_code,
+                    receive_code=receive_code,
+                    file_id=fid,
+                    parent_id=parent_id,
+                    save_path=save_path
+                ):
+                    success_ids.append(fid)
+                else:
+                    failed_ids.append(fid)
+            return
+
+        mid = len(file_ids) // 2
+        failed_halves = []
+        for half in (file_ids[:mid], file_ids[mid:]):
+            if self._do_transfer(
+                share_code=share_code,
+                receive_code=receive_code,
+                file_id=",".join(half),
+                parent_id=parent_id,
+                save_path=save_path
+            ):
+                success_ids.extend(half)
+            else:
+                failed_halves.append(half)
+
+        if len(failed_halves) > 1:
+            logger.warning("拆分后两部分均转存失败，停止拆分，%d 个文件记为失败", len(file_ids))
+            failed_ids.extend(file_ids)
+        elif failed_halves:
+            self._transfer_bisect(
+                share_code, receive_code, failed_halves[0], parent_id, save_path, success_ids, failed_ids
+            )
+
     def _do_transfer(
             self,
             share_code: str,
@@ -841,15 +1118,13 @@ class P115ClientManager:
         last_error = None
         for attempt in range(max_retries + 1):
             try:
-                self.rate_limiter.wait()
-                self._api_call_count += 1
-                resp = self.client.share_receive(payload)
+                resp = self._rate_limited_call(self.client.share_receive, payload)
 
                 if resp.get("state"):
                     if file_id == "0":
-                        logger.info(f"转存成功！已保存到: {save_path}")
+                        logger.info("转存成功！已保存到: %s", save_path)
                     else:
-                        logger.info(f"文件转存成功！文件ID: {file_id}, 保存到: {save_path}")
+                        logger.info("文件转存成功！文件ID: %s, 保存到: %s", file_id, save_path)
                     return True
                 else:
                     error_msg = resp.get("error", "未知错误")
@@ -857,14 +1132,14 @@ class P115ClientManager:
 
                     # 检查是否是重复文件
                     if "重复" in error_msg or "已存在" in error_msg:
-                        logger.info(f"文件已存在，跳过: {file_id}")
+                        logger.info("文件已存在，跳过: %s", file_id)
                         return True
 
                     # 检查是否是可重试的错误（如限流）
                     if error_code in (990001, 990002, 990009):  # 常见的限流错误码
                         if attempt < max_retries:
-                            wait_time = (attempt + 1) * 2  # 递增等待时间
-                            logger.warning(f"遇到限流，{wait_time}秒后重试 (尝试 {attempt + 1}/{max_retries + 1})")
+                            wait_time = backoff(attempt, base=2.0, cap=30.0)
+                            logger.warning("遇到限流，%.1f秒后重试 (尝试 %d/%d)", wait_time, attempt + 1, max_retries + 1)
                             time.sleep(wait_time)
                             continue
 
@@ -874,8 +1149,8 @@ class P115ClientManager:
             except Exception as e:
                 last_error = e
                 if attempt < max_retries:
-                    wait_time = (attempt + 1) * 1.5
-                    logger.warning(f"转存异常: {e}, {wait_time:.1f}秒后重试 (尝试 {attempt + 1}/{max_retries + 1})")
+                    wait_time = backoff(attempt, base=2.0, cap=30.0)
+                    logger.warning("转存异常: %s, %.1f秒后重试 (尝试 %d/%d)", e, wait_time, attempt + 1, max_retries + 1)
                     time.sleep(wait_time)
                 else:
                     logger.error(f"转存过程中发生异常: {e}")
@@ -898,16 +1173,34 @@ class P115ClientManager:
             return []
 
         try:
-            self.rate_limiter.wait()
-            self._api_call_count += 1
-            resp = self.client.fs_files({"cid": cid, "limit": 1000})
+            resp = self._rate_limited_call(self.client.fs_files, {"cid": cid, "limit": 1000})
             if resp.get("state"):
-                return resp.get("data", [])
+                data = resp.get("data", [])
+                self._warm_child_dirs(path, data)
+                return data
             return []
         except Exception as e:
             logger.error(f"列出文件失败: {e}")
             return []
 
+    def _warm_child_dirs(self, path: str, items: List[dict]):
+        """
+        用目录列表结果预热子目录的路径缓存，后续访问子目录时无需再请求 fs_dir_getid
+
+        :param path: 父目录路径
+        :param items: fs_files 返回的条目列表
+        """
+        parent = path.rstrip("/")
+        for item in items:
+            # 目录没有 fid，其 cid 即为目录 ID
+            if item.get("fid") or not item.get("cid"):
+                continue
+            name = item.get("n") or item.get("name")
+            if name:
+                child_path = f"{parent}/{name}"
+                self.path_cache.set(child_path, int(item["cid"]))
+                self._neg_path_cache.invalidate(child_path)
+
     def list_directories(self, path: str) -> List[dict]:
         """
         列出指定路径下的所有目录（不包含文件）
@@ -935,15 +1228,19 @@ class P115ClientManager:
         """清空路径缓存"""
         self.path_cache.clear()
         self.path_cache.set("/", 0)
+        self._neg_path_cache.clear()
 
     def clear_share_cache(self):
         """清空分享信息缓存"""
-        self._share_info_cache.clear()
+        _extract_share_info_cached.cache_clear()
+        self._share_status_cache.clear()
 
     def get_api_call_count(self) -> int:
         """获取 API 调用次数"""
-        return self._api_call_count
+        with self._api_call_lock:
+            return self._api_call_count
 
     def reset_api_call_count(self):
         """重置 API 调用计数器"""
-        self._api_call_count = 0
\ No newline at end of file
+        with self._api_call_lock:
+            self._api_call_count = 0
\ No newline at end of file
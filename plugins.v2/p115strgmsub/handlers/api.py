@@ -2,15 +2,36 @@
 API 处理模块
 负责插件的外部 API 接口
 """
-from typing import Callable
+import hmac
+from itertools import accumulate
+from typing import Callable, List
 
 from app.core.config import settings
 from app.log import logger
 
+from ..clients.p115 import PathCache
+
+
+def _check_apikey(apikey: str) -> bool:
+    """
+    校验 API 密钥（恒定时间比较，长度不同直接拒绝）
+
+    每次读取 settings.API_TOKEN，系统设置中修改令牌后立即生效
+
+    :param apikey: 请求携带的 API 密钥
+    :return: 是否有效
+    """
+    token = settings.API_TOKEN or ""
+    apikey = apikey or ""
+    return len(apikey) == len(token) and hmac.compare_digest(apikey.encode(), token.encode())
+
 
 class ApiHandler:
     """API 处理器"""
 
+    # 目录浏览结果缓存时间（秒）
+    DEFAULT_LIST_DIR_TTL = 60
+
     def __init__(
         self,
         pansou_client,
@@ -18,7 +39,8 @@ class ApiHandler:
         only_115: bool = True,
         save_path: str = "",
         get_data_func: Callable = None,
-        save_data_func: Callable = None
+        save_data_func: Callable = None,
+        music_handler=None
     ):
         """
         初始化 API 处理器
@@ -29,6 +51,7 @@ class ApiHandler:
         :param save_path: 默认转存目录
         :param get_data_func: 获取数据的函数
         :param save_data_func: 保存数据的函数
+        :param music_handler: 音乐 STRM 处理器
         """
         self._pansou_client = pansou_client
         self._p115_manager = p115_manager
@@ -36,6 +59,27 @@ class ApiHandler:
         self._save_path = save_path
         self._get_data = get_data_func
         self._save_data = save_data_func
+        self._music_handler = music_handler
+        # 目录浏览缓存：规范化路径 -> 目录列表，前端来回切换目录时无需重复请求 115
+        self._list_dir_cache = PathCache(default_ttl=self.DEFAULT_LIST_DIR_TTL, max_size=512)
+
+    @staticmethod
+    def _split_path(path: str) -> List[str]:
+        """将路径拆分为各级目录名（忽略空段）"""
+        return [p for p in (path or "").split("/") if p]
+
+    def _invalidate_list_dir_cache(self, path: str):
+        """
+        目录内容发生变化后使相关的目录浏览缓存失效
+
+        :param path: 发生变化的目录，其自身、子目录以及可能被新建出该目录的各级上级目录均失效
+        """
+        parts = self._split_path(path)
+        self._list_dir_cache.invalidate("/")
+        for current_path in accumulate(f"/{p}" for p in parts):
+            self._list_dir_cache.invalidate(current_path)
+        if parts:
+            self._list_dir_cache.invalidate_prefix(f"/{'/'.join(parts)}")
 
     def search(self, keyword: str, apikey: str) -> dict:
         """
@@ -45,7 +89,7 @@ class ApiHandler:
         :param apikey: API 密钥
         :return: 搜索结果
         """
-        if apikey != settings.API_TOKEN:
+        if not _check_apikey(apikey):
             return {"error": "API密钥错误"}
 
         if not self._pansou_client:
@@ -63,13 +107,18 @@ class ApiHandler:
         :param apikey: API 密钥
         :return: 转存结果
         """
-        if apikey != settings.API_TOKEN:
+        if not _check_apikey(apikey):
             return {"success": False, "error": "API密钥错误"}
 
         if not self._p115_manager:
             return {"success": False, "error": "115 客户端未初始化"}
 
-        success = self._p115_manager.transfer_share(share_url, save_path or self._save_path)
+        target_path = save_path or self._save_path
+        try:
+            success = self._p115_manager.transfer_share(share_url, target_path)
+        finally:
+            # 转存可能新建目录或文件，无论成功与否都让该路径的浏览缓存失效
+            self._invalidate_list_dir_cache(target_path)
         return {"success": success}
 
     def clear_history(self, apikey: str) -> dict:
@@ -79,7 +128,7 @@ class ApiHandler:
         :param apikey: API 密钥
         :return: 操作结果
         """
-        if apikey != settings.API_TOKEN:
+        if not _check_apikey(apikey):
             return {"success": False, "message": "API密钥错误"}
 
         if self._save_data:
@@ -87,6 +136,22 @@ class ApiHandler:
         logger.info("115网盘订阅追更历史记录已清空")
         return {"success": True, "message": "历史记录已清空"}
 
+    def clear_music_cache(self, apikey: str) -> dict:
+        """
+        API: 清空音乐目录列表缓存
+
+        :param apikey: API 密钥
+        :return: 操作结果
+        """
+        if not _check_apikey(apikey):
+            return {"success": False, "message": "API密钥错误"}
+
+        if not self._music_handler:
+            return {"success": False, "message": "音乐 STRM 未启用"}
+
+        self._music_handler.clear_cache()
+        return {"success": True, "message": "音乐目录缓存已清空"}
+
     def list_directories(self, path: str = "/", apikey: str = "") -> dict:
         """
         API: 列出115网盘指定路径下的目录
@@ -95,26 +160,28 @@ class ApiHandler:
         :param apikey: API 密钥
         :return: 目录列表
         """
-        if apikey != settings.API_TOKEN:
+        if not _check_apikey(apikey):
             return {"success": False, "error": "API密钥错误"}
 
         if not self._p115_manager:
             return {"success": False, "error": "115客户端未初始化"}
 
         try:
-            directories = self._p115_manager.list_directories(path)
-
-            # 构建面包屑导航
-            breadcrumbs = []
-            if path and path != "/":
-                parts = [p for p in path.split("/") if p]
-                current_path = ""
-                breadcrumbs.append({"name": "根目录", "path": "/"})
-                for part in parts:
-                    current_path = f"{current_path}/{part}"
-                    breadcrumbs.append({"name": part, "path": current_path})
-            else:
-                breadcrumbs.append({"name": "根目录", "path": "/"})
+            parts = self._split_path(path)
+            cache_key = f"/{'/'.join(parts)}"
+            directories = self._list_dir_cache.get(cache_key)
+            if directories is None:
+                directories = self._p115_manager.list_directories(path)
+                # 获取失败时同样返回空列表，空结果不缓存
+                if directories:
+                    self._list_dir_cache.set(cache_key, directories)
+
+            # 构建面包屑导航：根目录 + 各级目录的累积路径
+            breadcrumbs = [{"name": "根目录", "path": "/"}]
+            breadcrumbs += [
+                {"name": part, "path": current_path}
+                for part, current_path in zip(parts, accumulate(f"/{p}" for p in parts))
+            ]
 
             return {
                 "success": True,
@@ -2,26 +2,72 @@
 音乐 STRM 生成模块
 负责扫描 115 网盘音乐目录并生成本地 STRM 文件
 """
+import json
 import os
+import threading
+import time
 import urllib.parse
-from typing import List, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from app.log import logger
 
+from ..clients.p115 import RateLimiter
+
 class MusicStrmHandler:
-    # 支持的音乐格式
-    MUSIC_EXTS = {'.mp3', '.flac', '.wav', '.m4a', '.aac', '.ogg', '.dsf', '.dff', '.ape', '.wma', '.alac'}
+    # 支持的音乐格式（不含点号，小写）
+    MUSIC_EXTS = frozenset({'mp3', 'flac', 'wav', 'm4a', 'aac', 'ogg', 'dsf', 'dff', 'ape', 'wma', 'alac'})
+    # 目录列表缓存有效期（秒）：目录变化由修改时间校验发现，TTL 只作兜底，
+    # 需长于定时任务间隔（12 小时）才能在下次运行时命中，深层目录的变化最迟在过期后被发现
+    DEFAULT_CACHE_TTL = 3 * 86400
+    # 目录列表缓存文件名
+    DIRCACHE_FILE = "music_strm_dircache.json"
+    # 已生成 STRM 索引文件名（保存在本地 STRM 根目录下）
+    STRM_INDEX_FILE = ".strm_index"
+    # 并发扫描目录的线程数（fs_files 经由独立的速率限制器调度，多线程只重叠请求耗时，不会突发）
+    DEFAULT_MAX_WORKERS = 4
+    # fs_files 请求基础间隔（秒）：使用独立限速器，不与订阅同步共用 1.5 秒的间隔，也不计入其 API 调用次数；
+    # 每秒约 10 次，不超过原先单线程不限速扫描在 100ms 延迟下的请求频率
+    DEFAULT_MIN_INTERVAL = 0.1
 
-    def __init__(self, p115_manager, p115_root_path: str, local_save_path: str, url_prefix: str):
+    def __init__(self, p115_manager, p115_root_path: str, local_save_path: str, url_prefix: str,
+                 cache_dir: Optional[str] = None, cache_ttl: int = None, max_workers: int = None):
         """
         :param p115_manager: 115 客户端管理器实例
         :param p115_root_path: 115网盘中的音乐根目录 (如 /我的接收/Music)
         :param local_save_path: 本地保存 STRM 的根目录 (如 /mnt/user/music_strm)
         :param url_prefix: 播放链接前缀 (如 http://192.168.1.5:5244/d/115)
+        :param cache_dir: 目录列表缓存的持久化目录，为空则只在内存中缓存
+        :param cache_ttl: 目录列表缓存有效期（秒），默认 3 天
+        :param max_workers: 并发扫描目录的线程数
         """
         self._p115 = p115_manager
         self._p115_root = p115_root_path
         self._local_root = local_save_path
+        # 以 "/" 结尾的本地根目录前缀（根目录为 "/" 时即 "/"），热点路径中直接用 f-string 拼接，
+        # 不会出现重复的分隔符（Windows 同样接受 "/" 分隔符）
+        self._local_prefix = f"{local_save_path.rstrip('/')}/"
         self._url_prefix = url_prefix.rstrip('/')
+        self._max_workers = max_workers or self.DEFAULT_MAX_WORKERS
+        self._rate_limiter = RateLimiter(min_interval=self.DEFAULT_MIN_INTERVAL)
+
+        # 目录列表缓存：cid -> (获取时间, 目录修改时间, 文件列表)
+        # 根目录每次都重新获取，子目录只有在上级列表中的修改时间未变化时才使用缓存
+        self._cache_ttl = cache_ttl if cache_ttl is not None else self.DEFAULT_CACHE_TTL
+        self._dircache: Dict[int, Tuple[float, Optional[str], List[dict]]] = {}
+        self._dircache_lock = threading.Lock()
+        self._dircache_file = Path(cache_dir) / self.DIRCACHE_FILE if cache_dir else None
+        self._dircache_mtime = 0.0
+
+        # 本次运行中已创建（确认存在）的本地目录，避免每个文件都检查一次
+        self._known_dirs: Set[str] = set()
+        self._known_dirs_lock = threading.Lock()
+
+        # 已生成 STRM 索引：相对本地根目录的 STRM 路径 -> 播放链接
+        # 上次运行的索引用于跳过未变化的文件，本次运行确认过的条目在结束时写回
+        self._strm_index_file = Path(local_save_path) / self.STRM_INDEX_FILE
+        self._strm_index: Dict[str, str] = {}
+        self._strm_index_seen: Dict[str, str] = {}
 
     def run(self):
         """执行生成任务"""
@@ -30,99 +76,281 @@ class MusicStrmHandler:
             return
 
         logger.info(f"开始扫描 115 音乐目录: {self._p115_root}")
-        
+
         # 获取根目录 CID
         root_cid = self._p115.get_pid_by_path(self._p115_root, mkdir=False)
         if root_cid == -1:
             logger.error(f"115 路径不存在: {self._p115_root}")
             return
 
-        # 开始递归处理
-        self._process_directory(root_cid, self._p115_root)
+        self._load_dircache()
+        self._load_strm_index()
+        with self._known_dirs_lock:
+            self._known_dirs.clear()
+        try:
+            self._scan_all(root_cid)
+        finally:
+            self._save_dircache()
+            self._save_strm_index()
         logger.info("音乐 STRM 生成任务完成")
 
-    def _process_directory(self, cid: int, current_115_path: str):
-        """递归处理目录"""
+    def _scan_all(self, root_cid: int):
+        """使用线程池并发扫描目录树，每个目录扫描完成后再提交其子目录"""
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="music-strm") as pool:
+            pending = {pool.submit(self._scan_one, root_cid, self._p115_root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for sub_cid, sub_path, sub_mtime in future.result():
+                        pending.add(pool.submit(self._scan_one, sub_cid, sub_path, sub_mtime))
+
+    def clear_cache(self):
+        """清空目录列表缓存（内存和磁盘）及已生成 STRM 索引，下次运行将重新检查全部文件"""
+        with self._dircache_lock:
+            self._dircache.clear()
+            self._dircache_mtime = 0.0
+        if self._dircache_file:
+            try:
+                self._dircache_file.unlink(missing_ok=True)
+            except Exception as e:
+                logger.error(f"删除音乐目录缓存文件失败: {e}")
+        self._strm_index = {}
+        try:
+            self._strm_index_file.unlink(missing_ok=True)
+        except Exception as e:
+            logger.error(f"删除 STRM 索引文件失败: {e}")
+        logger.info("音乐目录列表缓存已清空")
+
+    def _load_strm_index(self):
+        """从磁盘加载已生成 STRM 索引"""
+        self._strm_index = {}
+        self._strm_index_seen = {}
+        if not self._strm_index_file.exists():
+            return
+        try:
+            with open(self._strm_index_file, "r", encoding="utf-8") as f:
+                self._strm_index = json.load(f)
+            logger.info(f"已加载 STRM 索引: {len(self._strm_index)} 个文件")
+        except Exception as e:
+            logger.warning(f"加载 STRM 索引失败: {e}")
+
+    def _save_strm_index(self):
+        """将本次运行确认过的 STRM 写入索引（未再出现的条目随之移除）"""
+        try:
+            os.makedirs(self._local_root, exist_ok=True)
+            with open(self._strm_index_file, "w", encoding="utf-8") as f:
+                json.dump(self._strm_index_seen, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"保存 STRM 索引失败: {e}")
+
+    def _load_dircache(self):
+        """从磁盘加载目录列表缓存（文件未变化时跳过）"""
+        if not self._dircache_file or not self._dircache_file.exists():
+            return
+        try:
+            mtime = self._dircache_file.stat().st_mtime
+            if mtime <= self._dircache_mtime:
+                return
+            with open(self._dircache_file, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            now = time.time()
+            with self._dircache_lock:
+                # 旧格式（不含目录修改时间）的条目无法校验，直接丢弃
+                self._dircache = {
+                    int(cid): (entry[0], entry[1], entry[2]) for cid, entry in raw.items()
+                    if len(entry) == 3 and now - entry[0] <= self._cache_ttl
+                }
+                self._dircache_mtime = mtime
+            logger.info(f"已加载音乐目录缓存: {len(self._dircache)} 个目录")
+        except Exception as e:
+            logger.warning(f"加载音乐目录缓存失败: {e}")
+
+    def _save_dircache(self):
+        """将目录列表缓存写入磁盘"""
+        if not self._dircache_file:
+            return
+        try:
+            with self._dircache_lock:
+                raw = {str(cid): list(entry) for cid, entry in self._dircache.items()}
+            self._dircache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._dircache_file, "w", encoding="utf-8") as f:
+                json.dump(raw, f, ensure_ascii=False)
+            self._dircache_mtime = self._dircache_file.stat().st_mtime
+        except Exception as e:
+            logger.warning(f"保存音乐目录缓存失败: {e}")
+
+    def _iter_files(self, cid: int, current_115_path: str, dir_mtime: Optional[str] = None) -> Iterator[dict]:
+        """
+        逐页获取目录下的条目并逐条产出
+
+        目录修改时间与缓存时一致且缓存未过期时直接使用缓存；未提供修改时间（如根目录）时总是重新获取。
+        每页返回后即可开始处理，无需等待全部分页获取完成；完整获取后写入缓存
+
+        :param cid: 目录 ID
+        :param current_115_path: 目录路径（用于日志）
+        :param dir_mtime: 上级目录列表中该目录的修改时间
+        :return: 条目迭代器
+        """
+        if dir_mtime is not None:
+            with self._dircache_lock:
+                cached = self._dircache.get(cid)
+            if cached and cached[1] == dir_mtime and time.time() - cached[0] <= self._cache_ttl:
+                yield from cached[2]
+                return
+
+        # 由于 p115.py 没有封装递归遍历"我的文件"的功能，我们这里手动实现简单的分页获取
+        items = []
+        offset = 0
+        limit = 1000
+        fs_files = self._p115.client.fs_files
+        rate_limit = self._rate_limiter.wait
+
+        while True:
+            rate_limit()
+            resp = fs_files({"cid": cid, "offset": offset, "limit": limit})
+            if not resp.get("state"):
+                logger.error(f"获取文件列表失败: {current_115_path}")
+                # 获取不完整，不写入缓存
+                return
+
+            # 只保留扫描用到的字段，减小内存和持久化缓存的体积
+            data = [
+                {"n": d.get("n", ""), "fid": d.get("fid"), "cid": d.get("cid"), "te": d.get("te")}
+                for d in resp.get("data", [])
+            ]
+            items.extend(data)
+            yield from data
+
+            offset += limit
+            if len(data) < limit:
+                break
+
+        # 没有修改时间的目录（根目录）每次都重新获取，无需缓存
+        if dir_mtime is None:
+            return
+        with self._dircache_lock:
+            self._dircache[cid] = (time.time(), dir_mtime, items)
+
+    def _scan_one(self, cid: int, current_115_path: str,
+                  dir_mtime: Optional[str] = None) -> List[Tuple[int, str, Optional[str]]]:
+        """
+        处理单个目录：为其中的音乐文件生成 STRM
+
+        :param cid: 目录 ID
+        :param current_115_path: 目录路径
+        :param dir_mtime: 上级目录列表中该目录的修改时间，用于校验缓存
+        :return: 需要继续扫描的子目录列表 [(cid, 路径, 修改时间)]
+        """
+        subdirs = []
+        music_files = []
+        music_exts = self.MUSIC_EXTS
+        # 同一目录下的文件共享目录部分，只编码一次
+        encoded_dir = urllib.parse.quote(current_115_path, safe="/")
+        # 相对路径 (用于本地目录结构)：移除 115 根路径前缀，每个目录只计算一次
+        rel_path = current_115_path.removeprefix(self._p115_root).lstrip("/")
         try:
-            # 使用 p115.py 中封装的 list_files，或者直接调 API 以获取更多信息
             # 这里直接调用 fs_files 获取 file_id 和 name
-            # 注意：p115.py 的 list_files 可能只返回第一页，这里建议使用 p115client 原生的遍历功能
-            
-            # 由于 p115.py 没有封装递归遍历"我的文件"的功能，我们这里手动实现简单的分页获取
-            offset = 0
-            limit = 1000
-            
-            while True:
-                resp = self._p115.client.fs_files({"cid": cid, "offset": offset, "limit": limit})
-                if not resp.get("state"):
-                    logger.error(f"获取文件列表失败: {current_115_path}")
-                    break
-                
-                data = resp.get("data", [])
-                if not data:
-                    break
-
-                for item in data:
-                    file_name = item.get("n", "")
-                    file_id = item.get("fid") # 文件ID，目录则不需要
-                    cid_id = item.get("cid")  # 目录ID
-                    
-                    # 115 API 中 fid 为 undefined 或 0 时通常是目录（取决于具体API），或者有 cid 字段
-                    # 更准确是用 'fid' 字段存在且不为0来判断是文件
-                    
-                    is_dir = False
-                    if "fid" in item and item["fid"]:
-                        is_dir = False
-                    else:
-                        is_dir = True
-
-                    # 相对路径 (用于本地目录结构)
-                    # 移除 115 根路径前缀，得到相对路径
-                    rel_path = current_115_path.replace(self._p115_root, "").lstrip("/")
-                    
-                    if is_dir:
-                        # 递归处理子目录
-                        sub_path = f"{current_115_path}/{file_name}"
-                        self._process_directory(cid_id, sub_path)
-                    else:
-                        # 处理文件
-                        ext = os.path.splitext(file_name)[1].lower()
-                        if ext in self.MUSIC_EXTS:
-                            self._generate_strm(file_name, rel_path, current_115_path)
-
-                offset += limit
-                if len(data) < limit:
-                    break
+            for item in self._iter_files(cid, current_115_path, dir_mtime):
+                file_name = item.get("n", "")
+
+                # 115 API 中 fid 为 undefined 或 0 时通常是目录（取决于具体API），或者有 cid 字段
+                # 更准确是用 'fid' 字段存在且不为0来判断是文件
+                if not item.get("fid"):
+                    # 子目录交给线程池继续扫描
+                    # te 为目录修改时间，目录内容变化后随之更新
+                    # 115 API 返回的 cid 为字符串，统一转为 int，与持久化缓存加载后的键一致
+                    subdirs.append((int(item["cid"]), f"{current_115_path}/{file_name}", item.get("te")))
+                else:
+                    # 处理文件
+                    _, dot, ext = file_name.rpartition('.')
+                    if dot and ext.lower() in music_exts:
+                        music_files.append(file_name)
+
+            if music_files:
+                self._generate_strm_batch(music_files, rel_path, encoded_dir)
 
         except Exception as e:
             logger.error(f"扫描目录出错 {current_115_path}: {e}")
 
-    def _generate_strm(self, file_name: str, relative_path: str, full_115_path: str):
-        """生成单个 STRM 文件"""
+        return subdirs
+
+    def _generate_strm_batch(self, file_names: List[str], relative_path: str, encoded_dir: str):
+        """
+        批量生成同一目录下的 STRM 文件
+
+        索引中已记录且链接未变化的文件直接跳过，不产生任何文件系统调用；
+        其余文件所在目录只创建一次
+
+        :param file_names: 文件名列表
+        :param relative_path: 相对于音乐根目录的路径（用于本地目录结构）
+        :param encoded_dir: 文件所在 115 目录的 URL 编码路径
+        """
+        index = self._strm_index
+        seen = self._strm_index_seen
+        pending = []
+        quote = urllib.parse.quote
+
+        # 构造播放链接
+        # 方式1: 使用 Alist / WebDAV 挂载路径 (最常用，推荐)
+        # 假设文件路径是 /我的接收/Music/Song.mp3
+        # url_prefix 是 http://alist:5244/d/115
+        # 最终 URL: http://alist:5244/d/115/我的接收/Music/Song.mp3
+
+        # 同目录文件共享的链接前缀只拼接一次，每个文件只需编码文件名
+        url_dir = f"{self._url_prefix}{encoded_dir}/"
+        for file_name in file_names:
+            final_url = url_dir + quote(file_name, safe='')
+            index_key = f"{relative_path}/{file_name}.strm" if relative_path else f"{file_name}.strm"
+            if index.get(index_key) == final_url:
+                seen[index_key] = final_url
+            else:
+                pending.append((file_name, index_key, final_url))
+
+        if not pending:
+            return
+
+        # 本地保存路径
+        local_dir = f"{self._local_prefix}{relative_path}/" if relative_path else self._local_prefix
+        if local_dir not in self._known_dirs:
+            os.makedirs(local_dir, exist_ok=True)
+            with self._known_dirs_lock:
+                self._known_dirs.add(local_dir)
+
+        for file_name, index_key, final_url in pending:
+            if self._generate_strm(f"{local_dir}{file_name}.strm", final_url):
+                seen[index_key] = final_url
+
+    def _generate_strm(self, strm_file: str, final_url: str) -> bool:
+        """
+        生成单个 STRM 文件
+
+        :param strm_file: STRM 文件路径
+        :param final_url: 播放链接
+        :return: STRM 文件是否已是最新内容
+        """
+        content = final_url.encode("utf-8")
+        tmp_file = f"{strm_file}.tmp"
         try:
-            # 本地保存路径
-            local_dir = os.path.join(self._local_root, relative_path)
-            if not os.path.exists(local_dir):
-                os.makedirs(local_dir, exist_ok=True)
-            
-            strm_file = os.path.join(local_dir, file_name + ".strm")
-            
-            # 构造播放链接
-            # 方式1: 使用 Alist / WebDAV 挂载路径 (最常用，推荐)
-            # 假设 full_115_path 是 /我的接收/Music/Song.mp3
-            # url_prefix 是 http://alist:5244/d/115
-            # 最终 URL: http://alist:5244/d/115/我的接收/Music/Song.mp3
-            
-            # 对路径进行 URL 编码
-            encoded_path = urllib.parse.quote(full_115_path)
-            # 处理路径拼接，确保斜杠正确
-            final_url = f"{self._url_prefix}{encoded_path}"
-            
-            # 写入文件
-            with open(strm_file, "w", encoding="utf-8") as f:
-                f.write(final_url)
-                
+            # 内容未变化时跳过写入，避免无谓的磁盘 IO
+            try:
+                with open(strm_file, "rb") as f:
+                    if f.read() == content:
+                        return True
+            except FileNotFoundError:
+                pass
+
+            # 先写临时文件再替换，避免中断时留下不完整的 STRM
+            with open(tmp_file, "wb") as f:
+                f.write(content)
+            os.replace(tmp_file, strm_file)
+
             # logger.debug(f"生成 STRM: {strm_file}")
-            
+            return True
+
         except Exception as e:
-            logger.error(f"生成 STRM 失败 {file_name}: {e}")
+            logger.error(f"生成 STRM 失败 {strm_file}: {e}")
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+            return False
@@ -194,8 +194,9 @@ class UIConfig:
                     {
                         'component': 'VRow',
                         'content': [
-                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VTextField', 'props': {'model': 'music_115_path', 'label': '115网盘音乐目录', 'placeholder': '/我的接收/Music'}}]},
-                            {'component': 'VCol', 'props': {'cols': 12, 'md': 6}, 'content': [{'component': 'VTextField', 'props': {'model': 'music_local_path', 'label': '本地 STRM 保存路径', 'placeholder': '/mnt/user/music'}}]}
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 5}, 'content': [{'component': 'VTextField', 'props': {'model': 'music_115_path', 'label': '115网盘音乐目录', 'placeholder': '/我的接收/Music'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 4}, 'content': [{'component': 'VTextField', 'props': {'model': 'music_local_path', 'label': '本地 STRM 保存路径', 'placeholder': '/mnt/user/music'}}]},
+                            {'component': 'VCol', 'props': {'cols': 12, 'md': 3}, 'content': [{'component': 'VTextField', 'props': {'model': 'music_cache_ttl', 'label': '目录缓存时长(秒)', 'type': 'number', 'placeholder': '259200', 'hint': '目录变化按修改时间自动发现，此值仅为兜底，应大于 12 小时的执行间隔'}}]}
                         ]
                     },
                     # 风控防护配置
@@ -248,11 +249,12 @@ class UIConfig:
             "exclude_subscribes": [],
             "block_system_subscribe": False,
             "max_transfer_per_sync": 50,
-            "batch_size": 20
+            "batch_size": 20,
             "music_sync_enabled": False,
             "music_url_prefix": "",
             "music_115_path": "/我的接收/Music",
             "music_local_path": "/data/music_strm",
+            "music_cache_ttl": 259200,
         }
         
         return form_schema, default_config
@@ -4,26 +4,42 @@
 """
 import base64
 import datetime
-import json
 import os
 import platform
+import re
+import shutil
+import time
 import urllib.request
 import urllib.error
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Any, List, Dict, Tuple
 
 from app.core.config import settings
 from app.log import logger
+try:
+    # orjson 解析小对象更快，未安装时回退到标准库
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
+# 运行平台信息（进程内不变，导入时获取一次）
+_SYSTEM = platform.system().lower()
+_MACHINE = platform.machine().lower()
 
+# Cookie 中的 token 字段
+_TOKEN_RE = re.compile(r'(?:^|;)\s*token=([^;]*)')
+
+
+@lru_cache(maxsize=1)
 def get_hdhive_extension_filename() -> Optional[str]:
     """
     根据当前平台获取 hdhive 扩展模块的文件名
 
     :return: 文件名，如果平台不支持则返回 None
     """
-    machine = platform.machine().lower()
-    system = platform.system().lower()
+    machine = _MACHINE
+    system = _SYSTEM
 
     # 映射架构名称
     arch_map = {
@@ -57,8 +73,8 @@ def download_so_file(lib_dir: Path):
     """
     lib_dir.mkdir(parents=True, exist_ok=True)
 
-    system = platform.system().lower()
-    machine = platform.machine().lower()
+    system = _SYSTEM
+    machine = _MACHINE
 
     # 获取当前平台对应的文件名
     ext_filename = get_hdhive_extension_filename()
@@ -94,11 +110,15 @@ def download_so_file(lib_dir: Path):
         else:
             response = urllib.request.urlopen(download_url, timeout=120)
 
-        with response:
-            content = response.read()
-
-        with open(target_path, "wb") as f:
-            f.write(content)
+        # 分块流式写入临时文件，下载完成后再替换，避免整个文件读入内存或留下不完整的文件
+        tmp_path = target_path.with_name(target_path.name + ".part")
+        try:
+            with response, open(tmp_path, "wb") as f:
+                shutil.copyfileobj(response, f, 1 << 20)
+            os.replace(tmp_path, target_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
 
         # 非 Windows 平台设置可执行权限
         if system != "windows":
@@ -127,11 +147,8 @@ def extract_token_from_hdhive_cookie(cookie: str) -> Optional[str]:
     if not cookie:
         return None
 
-    for part in cookie.split(';'):
-        part = part.strip()
-        if part.startswith('token='):
-            return part.split('=', 1)[1]
-    return None
+    match = _TOKEN_RE.search(cookie)
+    return match.group(1).strip() if match else None
 
 
 def decode_jwt_payload(token: str) -> Optional[dict]:
@@ -158,12 +175,31 @@ def decode_jwt_payload(token: str) -> Optional[dict]:
             payload += '=' * padding
 
         decoded = base64.urlsafe_b64decode(payload)
-        return json.loads(decoded)
+        return _json_loads(decoded)
     except Exception as e:
         logger.debug(f"解码 JWT 失败: {e}")
         return None
 
 
+@lru_cache(maxsize=8)
+def _parse_jwt(token: str) -> Optional[Tuple[int, datetime.datetime, Optional[str]]]:
+    """
+    解析 JWT token 中的过期时间和用户 ID（Cookie 很少变化，缓存解析结果）
+
+    :param token: JWT token 字符串
+    :return: (exp, exp_time, sub)，解析失败或没有过期时间返回 None
+    """
+    decoded = decode_jwt_payload(token)
+    if not decoded:
+        return None
+
+    exp = decoded.get('exp')
+    if not exp:
+        return None
+    # datetime 不可变，随解析结果一起缓存，避免每次检查都重新创建
+    return exp, datetime.datetime.fromtimestamp(exp), decoded.get('sub')
+
+
 def get_hdhive_token_info(cookie: str) -> Optional[dict]:
     """
     获取 HDHive Cookie 中 token 的信息（过期时间等）
@@ -175,24 +211,20 @@ def get_hdhive_token_info(cookie: str) -> Optional[dict]:
     if not token:
         return None
 
-    decoded = decode_jwt_payload(token)
-    if not decoded:
-        return None
-
-    exp = decoded.get('exp')
-    if not exp:
+    parsed = _parse_jwt(token)
+    if not parsed:
         return None
 
-    exp_time = datetime.datetime.fromtimestamp(exp)
-    now = datetime.datetime.now()
-    time_left = (exp_time - now).total_seconds()
+    exp, exp_time, user_id = parsed
+    # 剩余时间每次重新计算，不随解析结果缓存
+    time_left = exp - time.time()
 
     return {
         'exp': exp,
         'exp_time': exp_time,
         'time_left': time_left,
         'is_expired': time_left <= 0,
-        'user_id': decoded.get('sub')
+        'user_id': user_id
     }
 
 
@@ -416,14 +448,23 @@ def convert_nullbr_to_pansou_format(nullbr_resources: List[Dict]) -> List[Dict]:
     :param nullbr_resources: Nullbr 返回的资源列表
     :return: 统一格式的资源列表
     """
-    converted = []
-    for resource in nullbr_resources:
-        converted.append({
-            "url": resource.get("share_link", ""),
-            "title": resource.get("title", ""),
-            "update_time": ""  # Nullbr 没有更新时间字段
-        })
-    return converted
+    # Nullbr 没有更新时间字段
+    return [
+        {"url": resource.get("share_link", ""), "title": resource.get("title", ""), "update_time": ""}
+        for resource in nullbr_resources
+    ]
+
+
+def _get_hdhive_url_title(resource: Any) -> Tuple[str, str]:
+    """
+    获取 HDHive 资源的链接和标题（资源可能是对象或字典）
+
+    :param resource: HDHive 资源
+    :return: (url, title)
+    """
+    if isinstance(resource, dict):
+        return resource.get("url", "") or resource.get("share_url", ""), resource.get("title", "")
+    return getattr(resource, 'url', None) or "", getattr(resource, 'title', None) or ""
 
 
 def convert_hdhive_to_pansou_format(hdhive_resources: List[Any]) -> List[Dict]:
@@ -436,27 +477,9 @@ def convert_hdhive_to_pansou_format(hdhive_resources: List[Any]) -> List[Dict]:
     :param hdhive_resources: HDHive 返回的资源列表
     :return: 统一格式的资源列表
     """
-    converted = []
-    for resource in hdhive_resources:
-        # HDHive 资源可能是对象或字典
-        if hasattr(resource, 'url'):
-            url = resource.url or ""
-        elif isinstance(resource, dict):
-            url = resource.get("url", "") or resource.get("share_url", "")
-        else:
-            url = ""
-
-        if hasattr(resource, 'title'):
-            title = resource.title or ""
-        elif isinstance(resource, dict):
-            title = resource.get("title", "")
-        else:
-            title = ""
-
-        if url:  # 只添加有 URL 的资源
-            converted.append({
-                "url": url,
-                "title": title,
-                "update_time": ""
-            })
-    return converted
+    # 只保留有 URL 的资源
+    return [
+        {"url": url, "title": title, "update_time": ""}
+        for url, title in map(_get_hdhive_url_title, hdhive_resources)
+        if url
+    ]